@@ -2,11 +2,10 @@ from flask import Flask, redirect, render_template, url_for
 from flask import request, flash
 
 import sqlite3
+import conexoes
 
 def obter_conexao():
-    conexao = sqlite3.connect('banco.db')
-    conexao.row_factory = sqlite3.Row
-    return conexao
+    return conexoes.obter_conexao(row_factory=sqlite3.Row)
 
 app = Flask(__name__)
 
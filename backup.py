@@ -0,0 +1,209 @@
+# Backup do banco.db com os apps rodando.
+#
+# Usa a API de backup online do SQLite: copia algumas páginas por vez e
+# dorme entre um passo e outro. Se o banco está em modo WAL (o
+# iniciar.py já cria assim), a cópia segura uma transação de leitura do
+# começo ao fim: o retrato copiado fica fixo e quem está escrevendo
+# (cadastro, adicionar-carrinho) não espera pelo backup. O backup não
+# muda o modo do banco: sem WAL, cada escrita faz o SQLite recomeçar a
+# cópia do zero; depois de MAX_REINICIOS o backup desiste com erro.
+#
+# Uso no terminal:
+#     python backup.py criar backups/banco.db.gz
+#     python backup.py verificar backups/banco.db.gz
+#     python backup.py restaurar backups/banco.db.gz
+#
+# Uso nos apps:
+#     iniciar_backup_periodico('backups', intervalo=6 * 60 * 60)
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+log = logging.getLogger('backup')
+
+BANCO = 'banco.db'
+PAGINAS_POR_PASSO = 64
+PAUSA_ENTRE_PASSOS = 0.01
+MAX_REINICIOS = 3
+
+
+def copiar_online(origem, destino, paginas=PAGINAS_POR_PASSO, pausa=PAUSA_ENTRE_PASSOS):
+    # em WAL uma transação de leitura não bloqueia os escritores e
+    # congela o retrato: a cópia nunca recomeça
+    # só consulta o modo, não troca
+    wal = origem.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    if wal:
+        origem.execute('BEGIN')
+        origem.execute('SELECT count(*) FROM sqlite_master').fetchone()
+
+    anterior = None
+    reinicios = 0
+
+    def progresso(status, restantes, total):
+        nonlocal anterior, reinicios
+        # se sobrou mais do que no passo anterior, o SQLite recomeçou
+        if anterior is not None and restantes > anterior:
+            reinicios += 1
+            if reinicios > MAX_REINICIOS:
+                raise sqlite3.OperationalError(
+                    f'backup recomeçou {reinicios} vezes por causa de escritas; '
+                    'use o banco em modo WAL')
+        anterior = restantes
+        time.sleep(pausa)
+
+    inicio = time.perf_counter()
+    try:
+        origem.backup(destino, pages=paginas, progress=progresso)
+    finally:
+        if wal:
+            origem.rollback()
+    return time.perf_counter() - inicio
+
+
+def calcular_checksum(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def arquivo_checksum(caminho):
+    return caminho + '.sha256'
+
+
+def comprimido(caminho):
+    return caminho.endswith('.gz')
+
+
+def criar_backup(destino, banco=BANCO, paginas=PAGINAS_POR_PASSO, pausa=PAUSA_ENTRE_PASSOS):
+    pasta = os.path.dirname(destino) or '.'
+    os.makedirs(pasta, exist_ok=True)
+
+    # copia primeiro para um arquivo temporário na mesma pasta; só
+    # depois de pronto ele ganha o nome final
+    fd, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    os.close(fd)
+    try:
+        origem = sqlite3.connect(banco)
+        copia = sqlite3.connect(temporario)
+        inicio = time.perf_counter()
+        try:
+            duracao_copia = copiar_online(origem, copia, paginas, pausa)
+        finally:
+            copia.close()
+            origem.close()
+
+        if comprimido(destino):
+            with open(temporario, 'rb') as entrada, gzip.open(temporario + '.gz', 'wb') as saida:
+                shutil.copyfileobj(entrada, saida)
+            os.remove(temporario)
+            temporario += '.gz'
+
+        # o .sha256 é escrito antes do backup ganhar o nome final, assim
+        # todo backup com nome final já tem o seu checksum
+        checksum = calcular_checksum(temporario)
+        with open(arquivo_checksum(destino), 'w') as f:
+            f.write(f'{checksum}  {os.path.basename(destino)}\n')
+        os.replace(temporario, destino)
+    except BaseException:
+        for caminho in (temporario, temporario + '.gz'):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        raise
+
+    total = time.perf_counter() - inicio
+    log.info('backup %s criado em %.2f s (cópia %.2f s, gzip e checksum %.2f s)',
+             destino, total, duracao_copia, total - duracao_copia)
+    return checksum
+
+
+def descompactar(backup, pasta):
+    # devolve o caminho de um .db pronto para abrir (temporário se .gz)
+    if not comprimido(backup):
+        return backup
+    fd, caminho = tempfile.mkstemp(dir=pasta, suffix='.db')
+    with os.fdopen(fd, 'wb') as saida, gzip.open(backup, 'rb') as entrada:
+        shutil.copyfileobj(entrada, saida)
+    return caminho
+
+
+def verificar_backup(backup):
+    # confere o checksum e roda o integrity_check do SQLite
+    with open(arquivo_checksum(backup)) as f:
+        esperado = f.read().split()[0]
+    if calcular_checksum(backup) != esperado:
+        raise ValueError(f'checksum de {backup} não confere')
+
+    caminho = descompactar(backup, os.path.dirname(backup) or '.')
+    try:
+        conn = sqlite3.connect(caminho)
+        resultado = conn.execute('PRAGMA integrity_check').fetchone()[0]
+        conn.close()
+    finally:
+        if caminho != backup:
+            os.remove(caminho)
+    if resultado != 'ok':
+        raise ValueError(f'{backup} está corrompido: {resultado}')
+
+
+def restaurar_backup(backup, banco=BANCO):
+    verificar_backup(backup)
+    caminho = descompactar(backup, os.path.dirname(os.path.abspath(banco)))
+    try:
+        # restaurar também pela API de backup: os apps abertos veem o
+        # banco novo sem precisar reiniciar
+        origem = sqlite3.connect(caminho)
+        destino = sqlite3.connect(banco)
+        try:
+            origem.backup(destino)
+        finally:
+            destino.close()
+            origem.close()
+    finally:
+        if caminho != backup:
+            os.remove(caminho)
+    log.info('banco %s restaurado de %s', banco, backup)
+
+
+def iniciar_backup_periodico(pasta, intervalo=6 * 60 * 60, banco=BANCO, manter=5):
+    def rodar():
+        while True:
+            time.sleep(intervalo)
+            nome = time.strftime('banco-%Y%m%d-%H%M%S.db.gz')
+            try:
+                criar_backup(os.path.join(pasta, nome), banco)
+            except (sqlite3.Error, OSError) as erro:
+                log.warning('backup falhou: %s', erro)
+                continue
+            # apaga os mais antigos
+            antigos = sorted(n for n in os.listdir(pasta) if n.startswith('banco-') and n.endswith('.db.gz'))
+            for antigo in antigos[:-manter]:
+                caminho = os.path.join(pasta, antigo)
+                try:
+                    os.remove(caminho)
+                    os.remove(arquivo_checksum(caminho))
+                except OSError as erro:
+                    log.warning('não deu para apagar %s: %s', caminho, erro)
+
+    thread = threading.Thread(target=rodar, name='backup', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    comandos = {'criar': criar_backup, 'verificar': verificar_backup, 'restaurar': restaurar_backup}
+    if len(sys.argv) != 3 or sys.argv[1] not in comandos:
+        print('uso: python backup.py [criar|verificar|restaurar] ARQUIVO')
+        sys.exit(1)
+    comandos[sys.argv[1]](sys.argv[2])
+    if sys.argv[1] == 'verificar':
+        print('backup ok')
@@ -0,0 +1,282 @@
+# Microbenchmarks dos apps.
+# Uso: python bench.py
+#
+# Tudo roda num banco em memória, então o banco.db não é alterado.
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from cache import CacheLRU
+from modelos import User, Produto, SQL_CARRINHO, MapaIdentidade, montar_select
+
+
+def criar_banco_teste(n_produtos=500, n_itens=50):
+    conn = sqlite3.connect(':memory:')
+    conn.executescript('''
+        CREATE TABLE users (id INTEGER PRIMARY KEY, nome TEXT, email TEXT, senha TEXT);
+        CREATE TABLE produtos (id INTEGER PRIMARY KEY, nome TEXT, preco REAL, user_id INTEGER);
+        CREATE TABLE carrinho (id INTEGER PRIMARY KEY, user_id INTEGER, produto_id INTEGER, quantidade INTEGER);
+    ''')
+    conn.execute("INSERT INTO users VALUES (1, 'Ana', 'ana@email.com', 'hash')")
+    conn.executemany('INSERT INTO produtos VALUES (?, ?, ?, 1)',
+                     [(i, f'Produto {i}', i * 1.5) for i in range(1, n_produtos + 1)])
+    conn.executemany('INSERT INTO carrinho VALUES (?, 1, ?, 2)',
+                     [(i, i) for i in range(1, n_itens + 1)])
+    conn.commit()
+    return conn
+
+
+def medir(funcao, repeticoes=2000):
+    # devolve (microssegundos por chamada, bytes alocados por chamada)
+    funcao()
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    tempo = (time.perf_counter() - inicio) / repeticoes * 1e6
+
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tempo, pico
+
+
+def mostrar(nome, antes, depois):
+    print(f'{nome}: antes {antes[0]:.1f} us / {antes[1]} B | '
+          f'depois {depois[0]:.1f} us / {depois[1]} B')
+
+
+# --- Modelos (user-026) ---
+# Como era antes: sqlite3.Row + User com __dict__
+class UserAntigo:
+    def __init__(self, id, nome, email):
+        self.id = id
+        self.nome = nome
+        self.email = email
+
+
+def bench_modelos():
+    conn_row = criar_banco_teste()
+    conn_row.row_factory = sqlite3.Row
+    conn = criar_banco_teste()
+    # como o modelos.carregar_usuario: o User sai do cache do processo
+    usuarios = CacheLRU(10000, validade=60)
+
+    def usuario_depois(id):
+        usuario = usuarios.obter(id)
+        if usuario is None:
+            mapa = MapaIdentidade()
+            u = conn.execute(montar_select(User, 'WHERE id = ?'), (id,)).fetchone()
+            usuario = mapa.obter(User, u)
+            usuarios.guardar(id, usuario)
+        return usuario
+
+    def index_antes():
+        u = conn_row.execute('SELECT * FROM users WHERE id = ?', (1,)).fetchone()
+        UserAntigo(u['id'], u['nome'], u['email'])
+        return conn_row.execute('SELECT * FROM produtos').fetchall()
+
+    def index_depois():
+        usuario_depois(1)
+        return conn.execute(montar_select(Produto)).fetchall()
+
+    def carrinho_antes():
+        u = conn_row.execute('SELECT * FROM users WHERE id = ?', (1,)).fetchone()
+        UserAntigo(u['id'], u['nome'], u['email'])
+        itens = conn_row.execute(SQL_CARRINHO, (1,)).fetchall()
+        return sum(item['preco'] * item['quantidade'] for item in itens)
+
+    def carrinho_depois():
+        usuario_depois(1)
+        itens = conn.execute(SQL_CARRINHO, (1,)).fetchall()
+        return sum(preco * quantidade for _, _, preco, quantidade in itens)
+
+    mostrar('GET /', medir(index_antes, 500), medir(index_depois, 500))
+    mostrar('GET /carrinho', medir(carrinho_antes), medir(carrinho_depois))
+
+    # Memória que fica presa por objeto (o pico do tracemalloc inclui
+    # as tuplas temporárias do cursor)
+    row = conn_row.execute('SELECT * FROM produtos').fetchone()
+    antigo = UserAntigo(1, 'Ana', 'ana@email.com')
+    print(f'Produto: sqlite3.Row {sys.getsizeof(row) + sys.getsizeof(tuple(row))} B | '
+          f'tupla {sys.getsizeof(tuple(row))} B')
+    print(f'User: __dict__ {sys.getsizeof(antigo) + sys.getsizeof(antigo.__dict__)} B | '
+          f'slots {sys.getsizeof(User(1, "Ana", "ana@email.com"))} B')
+
+
+
+# --- Backup online (user-028) ---
+def p99(tempos):
+    tempos = sorted(tempos)
+    return tempos[int(len(tempos) * 0.99)] * 1000
+
+
+def bench_backup(n_escritas=2000, n_linhas=200000):
+    from backup import criar_backup
+
+    pasta = tempfile.mkdtemp()
+    banco = os.path.join(pasta, 'banco.db')
+    conn = sqlite3.connect(banco)
+    # mesmo modo que o iniciar.py deixa o banco
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('CREATE TABLE carrinho (id INTEGER PRIMARY KEY, user_id INTEGER, produto_id INTEGER, quantidade INTEGER)')
+    conn.executemany('INSERT INTO carrinho (user_id, produto_id, quantidade) VALUES (?, ?, 1)',
+                     [(i % 100, i) for i in range(n_linhas)])
+    conn.commit()
+    conn.close()
+
+    def escrever():
+        # como o /adicionar-carrinho: abre, insere, commit, fecha
+        tempos = []
+        for i in range(n_escritas):
+            inicio = time.perf_counter()
+            c = sqlite3.connect(banco, timeout=30)
+            c.execute('INSERT INTO carrinho (user_id, produto_id, quantidade) VALUES (?, ?, 1)', (1, i))
+            c.commit()
+            c.close()
+            tempos.append(time.perf_counter() - inicio)
+        return tempos
+
+    sem_backup = escrever()
+
+    parar = threading.Event()
+    completos = []
+
+    def backups():
+        while not parar.is_set():
+            completos.append(criar_backup(os.path.join(pasta, 'copia.db.gz'), banco))
+
+    thread = threading.Thread(target=backups)
+    thread.start()
+    com_backup = escrever()
+    parar.set()
+    thread.join()
+
+    print(f'escrita p99: sem backup {p99(sem_backup):.2f} ms | '
+          f'com backup rodando {p99(com_backup):.2f} ms '
+          f'({len(completos)} backups completos durante as escritas)')
+
+
+
+# --- Sessão no servidor (user-029) ---
+def bench_sessao(repeticoes=500):
+    from flask import Flask, flash, get_flashed_messages, request, session
+    from sessao_servidor import usar_sessao_servidor
+
+    def criar_app(servidor):
+        app = Flask(__name__)
+        app.secret_key = 'bench'
+        if servidor:
+            usar_sessao_servidor(app, 'bench', banco=os.path.join(tempfile.mkdtemp(), 'banco.db'))
+        tamanhos = []
+
+        @app.before_request
+        def medir_cookie():
+            tamanhos.append(len(request.headers.get('Cookie', '')))
+
+        @app.route('/login')
+        def login():
+            # o que o Flask-Login e a biblioteca colocam na sessão
+            session['_user_id'] = '1'
+            session['_fresh'] = True
+            session['_id'] = 'a' * 128
+            session['usuario'] = 'Ana'
+            if servidor:
+                # com o cookie assinado a biblioteca usa um cookie separado
+                session['ultimo_livro'] = 'Flask na Prática'
+            flash('Login feito com sucesso!', 'sucesso')
+            return 'ok'
+
+        @app.route('/livros')
+        def livros():
+            flash('Você emprestou "Aventuras de Alice"!', 'sucesso')
+            return str(session.get('usuario'))
+
+        @app.route('/')
+        def index():
+            get_flashed_messages()
+            return str(session.get('ultimo_livro'))
+
+        @app.route('/perfil')
+        def perfil():
+            # só lê a sessão: não grava nada
+            return str(session.get('usuario'))
+
+        return app, tamanhos
+
+    for nome, servidor in (('cookie assinado', False), ('sessão no servidor', True)):
+        app, tamanhos = criar_app(servidor)
+        cliente = app.test_client()
+        cliente.get('/login')
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            cliente.get('/livros')
+            cliente.get('/')
+        tempo = (time.perf_counter() - inicio) / (repeticoes * 2) * 1e6
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            cliente.get('/perfil')
+        leitura = (time.perf_counter() - inicio) / repeticoes * 1e6
+        print(f'{nome}: header Cookie até {max(tamanhos)} B, {tempo:.0f} us por requisição '
+              f'que grava, {leitura:.0f} us por requisição só de leitura')
+
+
+
+# --- Host com os quatro apps (user-031) ---
+CODIGO_CARREGAR = '''
+import resource, sys
+import host
+for prefixo in sys.argv[1:]:
+    host.carregar(prefixo)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+# uma requisição por prefixo, passando pelo host.app de verdade
+CODIGO_REQUISICOES = '''
+import sys
+from werkzeug.test import Client
+import host
+cliente = Client(host.app)
+for caminho in sys.argv[1:]:
+    print(caminho, cliente.get(caminho).status_code)
+'''
+
+
+def bench_host():
+    from host import APPS
+
+    pasta = tempfile.mkdtemp()
+    shutil.copy('schema.sql', pasta)
+    ambiente = dict(os.environ, PYTHONPATH=os.path.abspath('.'))
+    subprocess.run([sys.executable, os.path.abspath('iniciar.py')], cwd=pasta, check=True)
+
+    def iniciar(prefixos):
+        # devolve (segundos até carregar, RSS máximo em KB)
+        inicio = time.perf_counter()
+        saida = subprocess.run([sys.executable, '-c', CODIGO_CARREGAR, *prefixos], cwd=pasta,
+                               env=ambiente, capture_output=True, text=True, check=True)
+        return time.perf_counter() - inicio, int(saida.stdout.split()[-1])
+
+    separados = [iniciar([prefixo]) for prefixo in APPS]
+    junto = iniciar(list(APPS))
+    print(f'4 processos: {sum(t for t, _ in separados):.2f} s, '
+          f'{sum(r for _, r in separados) / 1024:.0f} MB de RSS somado')
+    print(f'host.py: {junto[0]:.2f} s, {junto[1] / 1024:.0f} MB de RSS')
+
+    caminhos = [f'{prefixo}/' for prefixo in APPS] + ['/loja/login', '/loja/cadastro']
+    saida = subprocess.run([sys.executable, '-c', CODIGO_REQUISICOES, *caminhos],
+                           cwd=pasta, env=ambiente, capture_output=True, text=True, check=True)
+    print('host.app: ' + ', '.join(saida.stdout.strip().splitlines()))
+
+
+if __name__ == '__main__':
+    bench_modelos()
+    bench_backup()
+    bench_sessao()
+    bench_host()
@@ -1,12 +1,18 @@
 from flask import Flask, render_template, request, redirect, url_for, flash, session, make_response
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
+from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 import json
 import os
+from modelos import User, mapa_da_requisicao
+from sessao_servidor import configurar_sessao
 
 app = Flask(__name__)
 app.secret_key = 'chave-da-biblioteca'
 
+# Sessão no servidor: o cookie leva só o id (opcional: SESSAO_SERVIDOR=1,
+# ver sessao_servidor.py)
+sessao_no_servidor = configurar_sessao(app, 'biblioteca') is not None
+
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
@@ -34,19 +40,22 @@ else:
         json.dump(livros, f, indent=4)
 
 # --- Usuário para Flask-Login ---
-class User(UserMixin):
-    def __init__(self, nome):
-        self.id = nome
+# Aqui o id do usuário é o próprio nome (modelos.User)
+def obter_usuario(nome):
+    return mapa_da_requisicao().obter(User, (nome, nome, None))
 
 @login_manager.user_loader
 def load_user(user_id):
     if user_id in usuarios:
-        return User(user_id)
+        return obter_usuario(user_id)
 
 # --- Rotas ---
 @app.route('/')
 def index():
-    ultimo = request.cookies.get('ultimo_livro')
+    if sessao_no_servidor:
+        ultimo = session.get('ultimo_livro')
+    else:
+        ultimo = request.cookies.get('ultimo_livro')
     return f'<h1>Bem-vindo à Biblioteca!</h1><p>Último livro emprestado: {ultimo or "nenhum"}</p>'
 
 @app.route('/cadastro', methods=['GET', 'POST'])
@@ -69,7 +78,7 @@ def login():
         nome = request.form['nome']
         senha = request.form['senha']
         if nome in usuarios and check_password_hash(usuarios[nome], senha):
-            login_user(User(nome))
+            login_user(obter_usuario(nome))
             session['usuario'] = nome
             flash('Login feito com sucesso!', 'sucesso')
             return redirect(url_for('livros'))
@@ -98,6 +107,11 @@ def emprestar(livro):
         with open(LIVROS_ARQ, 'w') as f:
             json.dump(livros, f, indent=4)
         flash(f'Você emprestou "{livro}"!', 'sucesso')
+        # com a sessão no servidor fica nela; com o cookie assinado
+        # continua num cookie separado, para não crescer o da sessão
+        if sessao_no_servidor:
+            session['ultimo_livro'] = livro
+            return redirect(url_for('livros_view'))
         resp = make_response(redirect(url_for('livros_view')))
         resp.set_cookie('ultimo_livro', livro)
         return resp
@@ -0,0 +1,43 @@
+# Cache LRU simples e seguro para threads, usado pela sessão no servidor
+# e pelo cache de usuários. Com validade (em segundos), cada item também
+# vence depois desse tempo.
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    def __init__(self, capacidade, validade=None):
+        self.capacidade = capacidade
+        self.validade = validade
+        # chave -> (valor, momento em que vence)
+        self.itens = OrderedDict()
+        self.lock = threading.Lock()
+
+    def obter(self, chave):
+        with self.lock:
+            item = self.itens.get(chave)
+            if item is None:
+                return None
+            valor, vence = item
+            if vence is not None and vence < time.monotonic():
+                del self.itens[chave]
+                return None
+            self.itens.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave, valor):
+        vence = None if self.validade is None else time.monotonic() + self.validade
+        with self.lock:
+            self.itens[chave] = (valor, vence)
+            self.itens.move_to_end(chave)
+            if len(self.itens) > self.capacidade:
+                self.itens.popitem(last=False)
+
+    def remover(self, chave):
+        with self.lock:
+            self.itens.pop(chave, None)
+
+    def limpar(self):
+        with self.lock:
+            self.itens.clear()
@@ -44,45 +44,54 @@ CREATE TABLE IF NOT EXISTS carrinho (
     FOREIGN KEY (produto_id) REFERENCES produtos(id)
 );
 
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_carrinho_user_produto ON carrinho(user_id, produto_id);
+
 # Arquivo: app.py
 from flask import Flask, render_template, request, redirect, url_for, flash
-from flask_login import LoginManager, login_user, logout_user, login_required, UserMixin, current_user
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-import sqlite3
+import conexoes
+from modelos import User, Produto, SQL_CARRINHO, mapa_da_requisicao, carregar_usuario, buscar_todos
+from manutencao import iniciar_manutencao
+from sessao_servidor import configurar_sessao
+from backup import iniciar_backup_periodico
 
 app = Flask(__name__)
 app.secret_key = 'segredo-super-seguro'
 
+# Sessão no servidor em vez do cookie assinado (opcional: SESSAO_SERVIDOR=1)
+configurar_sessao(app, 'loja')
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-def obter_conexao():
-    conexao = sqlite3.connect('banco.db')
-    conexao.row_factory = sqlite3.Row
-    conexao.execute('PRAGMA foreign_keys = ON')
-    return conexao
+# ANALYZE, checkpoint do WAL e vacuum em segundo plano
+manutencao = iniciar_manutencao(app)
 
-class User(UserMixin):
-    def __init__(self, id, nome, email):
-        self.id = id
-        self.nome = nome
-        self.email = email
+# Backup online a cada 6 horas, sem parar o app (ver backup.py)
+iniciar_backup_periodico('backups')
+
+# Conexão do pool compartilhado (conexoes.py), já com foreign_keys ligado.
+# Sem row_factory: os modelos são montados direto das tuplas do cursor
+def obter_conexao():
+    return conexoes.obter_conexao()
 
 @login_manager.user_loader
 def load_user(user_id):
-    conn = obter_conexao()
-    usuario = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
-    conn.close()
-    if usuario:
-        return User(id=usuario['id'], nome=usuario['nome'], email=usuario['email'])
-    return None
+    # o Flask-Login espera None para um id inválido, não uma exceção
+    try:
+        user_id = int(user_id)
+    except ValueError:
+        return None
+    return carregar_usuario(obter_conexao, user_id)
 
 @app.route('/')
 @login_required
 def index():
     conn = obter_conexao()
-    produtos = conn.execute('SELECT * FROM produtos').fetchall()
+    produtos = buscar_todos(conn, Produto)
     conn.close()
     return render_template('index.html', nome=current_user.nome, produtos=produtos)
 
@@ -96,6 +105,7 @@ def cadastro():
         conn = obter_conexao()
         conn.execute('INSERT INTO users (nome, email, senha) VALUES (?, ?, ?)', (nome, email, senha_hash))
         conn.commit()
+        manutencao.registrar_alteracoes(conn.total_changes)
         conn.close()
         flash('Cadastro realizado com sucesso!')
         return redirect(url_for('login'))
@@ -107,10 +117,10 @@ def login():
         email = request.form['email']
         senha = request.form['senha']
         conn = obter_conexao()
-        usuario = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+        usuario = conn.execute('SELECT id, nome, email, senha FROM users WHERE email = ?', (email,)).fetchone()
         conn.close()
-        if usuario and check_password_hash(usuario['senha'], senha):
-            user = User(id=usuario['id'], nome=usuario['nome'], email=usuario['email'])
+        if usuario and check_password_hash(usuario[3], senha):
+            user = mapa_da_requisicao().obter(User, usuario[:3])
             login_user(user)
             flash('Login realizado com sucesso!')
             return redirect(url_for('index'))
@@ -134,6 +144,7 @@ def adicionar_produto():
         conn = obter_conexao()
         conn.execute('INSERT INTO produtos (nome, preco, user_id) VALUES (?, ?, ?)', (nome, preco, current_user.id))
         conn.commit()
+        manutencao.registrar_alteracoes(conn.total_changes)
         conn.close()
         flash('Produto adicionado com sucesso!')
         return redirect(url_for('index'))
@@ -143,12 +154,13 @@ def adicionar_produto():
 @login_required
 def adicionar_carrinho(produto_id):
     conn = obter_conexao()
-    item = conn.execute('SELECT * FROM carrinho WHERE user_id = ? AND produto_id = ?', (current_user.id, produto_id)).fetchone()
+    item = conn.execute('SELECT id FROM carrinho WHERE user_id = ? AND produto_id = ?', (current_user.id, produto_id)).fetchone()
     if item:
-        conn.execute('UPDATE carrinho SET quantidade = quantidade + 1 WHERE id = ?', (item['id'],))
+        conn.execute('UPDATE carrinho SET quantidade = quantidade + 1 WHERE id = ?', (item[0],))
     else:
         conn.execute('INSERT INTO carrinho (user_id, produto_id, quantidade) VALUES (?, ?, 1)', (current_user.id, produto_id))
     conn.commit()
+    manutencao.registrar_alteracoes(conn.total_changes)
     conn.close()
     flash('Produto adicionado ao carrinho!')
     return redirect(url_for('index'))
@@ -157,11 +169,10 @@ def adicionar_carrinho(produto_id):
 @login_required
 def carrinho():
     conn = obter_conexao()
-    itens = conn.execute('''SELECT c.id, p.nome, p.preco, c.quantidade FROM carrinho c
-                            JOIN produtos p ON c.produto_id = p.id
-                            WHERE c.user_id = ?''', (current_user.id,)).fetchall()
+    # tuplas simples: (id, nome, preco, quantidade)
+    itens = conn.execute(SQL_CARRINHO, (current_user.id,)).fetchall()
     conn.close()
-    total = sum(item['preco'] * item['quantidade'] for item in itens)
+    total = sum(preco * quantidade for _, _, preco, quantidade in itens)
     return render_template('carrinho.html', itens=itens, total=total)
 
 if __name__ == '__main__':
@@ -179,9 +190,9 @@ if __name__ == '__main__':
 
     <h2>Produtos:</h2>
     <ul>
-      {% for produto in produtos %}
-        <li>{{ produto['nome'] }} - R$ {{ produto['preco'] }} 
-          <a href="{{ url_for('adicionar_carrinho', produto_id=produto['id']) }}">Adicionar ao Carrinho</a>
+      {% for id, nome, preco, user_id in produtos %}
+        <li>{{ nome }} - R$ {{ preco }} 
+          <a href="{{ url_for('adicionar_carrinho', produto_id=id) }}">Adicionar ao Carrinho</a>
         </li>
       {% endfor %}
     </ul>
@@ -210,8 +221,8 @@ if __name__ == '__main__':
   <body>
     <h1>Seu Carrinho</h1>
     <ul>
-      {% for item in itens %}
-        <li>{{ item['nome'] }} - R$ {{ item['preco'] }} x {{ item['quantidade'] }}</li>
+      {% for id, nome, preco, quantidade in itens %}
+        <li>{{ nome }} - R$ {{ preco }} x {{ quantidade }}</li>
       {% endfor %}
     </ul>
     <h2>Total: R$ {{ total }}</h2>
@@ -0,0 +1,90 @@
+# Pool de conexões com o SQLite, compartilhado pelos apps.
+#
+# Abrir uma conexão nova a cada requisição custa abrir o arquivo e ler
+# o schema de novo. Aqui as conexões ficam guardadas e são reusadas: o
+# conn.close() dos apps devolve a conexão para o pool em vez de fechar.
+# Quando todos os apps rodam no mesmo processo (host.py), todos usam o
+# mesmo pool.
+import queue
+import sqlite3
+import threading
+
+BANCO = 'banco.db'
+
+
+class ConexaoDoPool:
+    __slots__ = ('conexao', 'pool', 'alteracoes_inicio')
+
+    def __init__(self, conexao, pool):
+        self.conexao = conexao
+        self.pool = pool
+        self.alteracoes_inicio = conexao.total_changes
+
+    def aberta(self):
+        # depois do close() a conexão já pode estar com outra thread
+        if self.conexao is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return self.conexao
+
+    def __getattr__(self, nome):
+        return getattr(self.aberta(), nome)
+
+    def __enter__(self):
+        # igual ao sqlite3: o with faz commit ou rollback, não fecha
+        self.aberta().__enter__()
+        return self
+
+    def __exit__(self, *erro):
+        return self.aberta().__exit__(*erro)
+
+    @property
+    def total_changes(self):
+        # só as alterações feitas desde que saiu do pool
+        return self.aberta().total_changes - self.alteracoes_inicio
+
+    def close(self):
+        # fechar duas vezes não pode devolver a mesma conexão duas vezes
+        if self.conexao is None:
+            return
+        conexao, self.conexao = self.conexao, None
+        self.pool.devolver(conexao)
+
+
+class Pool:
+    def __init__(self, banco=BANCO, tamanho=8):
+        self.banco = banco
+        self.livres = queue.LifoQueue(maxsize=tamanho)
+
+    def conectar(self):
+        conexao = sqlite3.connect(self.banco, check_same_thread=False)
+        conexao.execute('PRAGMA foreign_keys = ON')
+        return conexao
+
+    def obter(self, row_factory=None):
+        try:
+            conexao = self.livres.get_nowait()
+        except queue.Empty:
+            conexao = self.conectar()
+        conexao.row_factory = row_factory
+        return ConexaoDoPool(conexao, self)
+
+    def devolver(self, conexao):
+        # descarta o que ficou sem commit, como o close() faria
+        if conexao.in_transaction:
+            conexao.rollback()
+        try:
+            self.livres.put_nowait(conexao)
+        except queue.Full:
+            conexao.close()
+
+
+pools = {}
+lock = threading.Lock()
+
+
+def obter_conexao(banco=BANCO, row_factory=None):
+    pool = pools.get(banco)
+    if pool is None:
+        with lock:
+            pool = pools.setdefault(banco, Pool(banco))
+    return pool.obter(row_factory)
@@ -0,0 +1,111 @@
+# Testa como as consultas dos apps crescem com o tamanho do banco.
+#
+# Para cada escala gera um banco com gerar_dados.py, mede as consultas
+# mais usadas de cada app e ajusta a curva tempo ~ escala^k (reta no
+# gráfico log-log). Consulta que deveria usar índice e cresce perto de
+# k = 1 é uma busca que virou O(n) sem querer: o script falha.
+#
+# Uso: python escala.py                 (10 mil, 100 mil e 1 milhão)
+#      python escala.py 10000 10000000  (escalas escolhidas)
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from gerar_dados import gerar
+from modelos import User, Produto, SQL_CARRINHO, montar_select
+
+# (app, rota, SQL, gera os parâmetros, expoente máximo aceito)
+# Listagens devolvem a tabela inteira, então crescer linear é esperado.
+# Sempre que dá, o SQL vem do modelos.py, o mesmo que os apps rodam.
+CONSULTAS = [
+    ('carrinho.py', '/login',
+     'SELECT id, nome, email, senha FROM users WHERE email = ?',
+     lambda rng, n: (f'usuario{usuario_tipico(rng, n)}@email.com',), 0.35),
+    ('carrinho.py', 'load_user',
+     montar_select(User, 'WHERE id = ?'),
+     lambda rng, n: (usuario_tipico(rng, n),), 0.35),
+    ('carrinho.py', '/',
+     montar_select(Produto),
+     None, 1.2),
+    ('carrinho.py', '/adicionar-carrinho',
+     'SELECT id FROM carrinho WHERE user_id = ? AND produto_id = ?',
+     lambda rng, n: (usuario_tipico(rng, n), rng.randint(1, n['produtos'])), 0.35),
+    ('carrinho.py', '/carrinho',
+     SQL_CARRINHO,
+     lambda rng, n: (usuario_tipico(rng, n),), 0.35),
+    # nenhum app consulta books e filmes ainda (a biblioteca usa os
+    # .json); estas só conferem os índices idx_books_user e idx_filmes_user
+    ('schema.sql', 'books por user_id',
+     'SELECT id, titulo FROM books WHERE user_id = ?',
+     lambda rng, n: (usuario_tipico(rng, n),), 0.35),
+    ('schema.sql', 'filmes por user_id',
+     'SELECT id, titulo FROM filmes WHERE user_id = ?',
+     lambda rng, n: (usuario_tipico(rng, n),), 0.35),
+    ('app.py', '/',
+     'SELECT * FROM users',
+     None, 1.2),
+]
+
+CHAMADAS = 300
+REPETICOES = 3
+
+
+def usuario_tipico(rng, n):
+    # fora do 1% mais pesado: o que importa é o usuário comum
+    return rng.randint(n['users'] // 100 + 1, n['users'])
+
+
+def medir(conn, sql, parametros, n):
+    melhor = math.inf
+    for repeticao in range(REPETICOES):
+        rng = random.Random(repeticao)
+        if parametros is None:
+            lista = [()] * 5
+        else:
+            lista = [parametros(rng, n) for _ in range(CHAMADAS)]
+        inicio = time.perf_counter()
+        for p in lista:
+            conn.execute(sql, p).fetchall()
+        melhor = min(melhor, (time.perf_counter() - inicio) / len(lista))
+    return melhor
+
+
+def expoente(escalas, tempos):
+    # mínimos quadrados de log(tempo) = k * log(escala) + c
+    xs = [math.log(e) for e in escalas]
+    ys = [math.log(t) for t in tempos]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    return (sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+            / sum((x - mx) ** 2 for x in xs))
+
+
+def rodar(escalas):
+    tempos = {i: [] for i in range(len(CONSULTAS))}
+    pasta = tempfile.mkdtemp()
+    for escala in escalas:
+        caminho = os.path.join(pasta, f'escala-{escala}.db')
+        n = gerar(caminho, escala)
+        conn = sqlite3.connect(caminho)
+        for i, (app, rota, sql, parametros, _) in enumerate(CONSULTAS):
+            tempos[i].append(medir(conn, sql, parametros, n))
+        conn.close()
+        os.remove(caminho)
+
+    falhas = 0
+    print(f'{"app":<12} {"rota":<22}' + ''.join(f'{e:>12}' for e in escalas) + '       k')
+    for i, (app, rota, _, _, limite) in enumerate(CONSULTAS):
+        k = expoente(escalas, tempos[i])
+        status = 'ok' if k <= limite else 'FALHOU'
+        falhas += status != 'ok'
+        print(f'{app:<12} {rota:<22}' + ''.join(f'{t * 1e6:>10.1f}us' for t in tempos[i])
+              + f'  {k:6.2f}  {status} (limite {limite})')
+    return falhas
+
+
+if __name__ == '__main__':
+    escalas = [int(e) for e in sys.argv[1:]] or [10000, 100000, 1000000]
+    sys.exit(1 if rodar(escalas) else 0)
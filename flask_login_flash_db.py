@@ -29,41 +29,43 @@ CREATE TABLE IF NOT EXISTS users (
 
 # Arquivo: app.py
 from flask import Flask, render_template, request, redirect, url_for, flash
-from flask_login import LoginManager, login_user, logout_user, login_required, UserMixin, current_user
+from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-import sqlite3
+import conexoes
+from modelos import User, mapa_da_requisicao, carregar_usuario
+from manutencao import iniciar_manutencao
+from sessao_servidor import configurar_sessao
 
-# Função para conectar ao banco
+# Função para conectar ao banco (pega uma conexão do pool)
+# (sem row_factory: o User é montado direto da tupla do cursor)
 def obter_conexao():
-    conexao = sqlite3.connect('banco.db')
-    conexao.row_factory = sqlite3.Row
-    return conexao
+    return conexoes.obter_conexao()
 
 # Iniciando o Flask
 app = Flask(__name__)
 app.secret_key = 'segredo-super-seguro'
 
+# Sessão guardada no servidor: o cookie leva só o id (opcional: SESSAO_SERVIDOR=1)
+configurar_sessao(app, 'login_flash')
+
 # Configurando o Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-# Classe User para o Flask-Login
-class User(UserMixin):
-    def __init__(self, id, nome, email):
-        self.id = id
-        self.nome = nome
-        self.email = email
+# Manutenção do banco em segundo plano (ANALYZE, WAL, vacuum)
+manutencao = iniciar_manutencao(app)
 
 # Função para carregar usuário pelo ID (Flask-Login)
+# A classe User fica em modelos.py
 @login_manager.user_loader
 def load_user(user_id):
-    conn = obter_conexao()
-    usuario = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
-    conn.close()
-    if usuario:
-        return User(id=usuario['id'], nome=usuario['nome'], email=usuario['email'])
-    return None
+    # o Flask-Login espera None para um id inválido, não uma exceção
+    try:
+        user_id = int(user_id)
+    except ValueError:
+        return None
+    return carregar_usuario(obter_conexao, user_id)
 
 # Rota Principal (só acessa se estiver logado)
 @app.route('/')
@@ -83,6 +85,7 @@ def cadastro():
         conn = obter_conexao()
         conn.execute('INSERT INTO users (nome, email, senha) VALUES (?, ?, ?)', (nome, email, senha_hash))
         conn.commit()
+        manutencao.registrar_alteracoes(conn.total_changes)
         conn.close()
 
         flash('Cadastro realizado com sucesso!')
@@ -98,11 +101,11 @@ def login():
         senha = request.form['senha']
 
         conn = obter_conexao()
-        usuario = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+        usuario = conn.execute('SELECT id, nome, email, senha FROM users WHERE email = ?', (email,)).fetchone()
         conn.close()
 
-        if usuario and check_password_hash(usuario['senha'], senha):
-            user = User(id=usuario['id'], nome=usuario['nome'], email=usuario['email'])
+        if usuario and check_password_hash(usuario[3], senha):
+            user = mapa_da_requisicao().obter(User, usuario[:3])
             login_user(user)
             flash('Login realizado com sucesso!')
             return redirect(url_for('index'))
@@ -0,0 +1,87 @@
+# Gera dados falsos (mas realistas) para testar os apps com bancos grandes.
+#
+# Sempre gera os mesmos dados para a mesma escala e semente:
+# - poucos usuários concentram a maior parte do carrinho, livros e filmes
+# - a popularidade dos produtos segue uma distribuição de Zipf
+#
+# Uso: python gerar_dados.py teste.db 100000
+# (nunca aponte para o banco.db de verdade: o arquivo é recriado)
+import itertools
+import os
+import random
+import sqlite3
+import sys
+
+# ao lado deste arquivo, de qualquer pasta que o script rode
+SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+
+
+def pesos_zipf(n, s=1.1):
+    # pesos acumulados de 1/k^s, para usar no random.choices
+    return list(itertools.accumulate(1 / k ** s for k in range(1, n + 1)))
+
+
+def tamanhos(escala):
+    # a escala é o número de linhas do carrinho; as outras tabelas
+    # crescem junto
+    return {
+        'users': max(escala // 10, 10),
+        'produtos': max(escala // 10, 10),
+        'carrinho': escala,
+        'books': escala,
+        'filmes': escala // 2,
+    }
+
+
+def sorteio(rng, n, pesos, k, lote=100000):
+    # sorteia ids de 1 a n em lotes, para não criar listas enormes
+    ids = range(1, n + 1)
+    while k > 0:
+        yield from rng.choices(ids, cum_weights=pesos, k=min(k, lote))
+        k -= lote
+
+
+def gerar(caminho, escala, semente=42):
+    if os.path.exists(caminho):
+        os.remove(caminho)
+    rng = random.Random(semente)
+    n = tamanhos(escala)
+
+    conn = sqlite3.connect(caminho)
+    # só para gerar mais rápido; o arquivo é descartável
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    with open(SCHEMA) as f:
+        conn.executescript(f.read())
+
+    conn.executemany(
+        'INSERT INTO users (id, nome, email, senha) VALUES (?, ?, ?, ?)',
+        ((i, f'Usuário {i}', f'usuario{i}@email.com', 'hash') for i in range(1, n['users'] + 1)))
+    conn.executemany(
+        'INSERT INTO produtos (id, nome, preco, user_id) VALUES (?, ?, ?, ?)',
+        ((i, f'Produto {i}', round(rng.uniform(1, 500), 2), rng.randint(1, n['users']))
+         for i in range(1, n['produtos'] + 1)))
+
+    usuarios = pesos_zipf(n['users'])
+    produtos = pesos_zipf(n['produtos'])
+    conn.executemany(
+        'INSERT INTO carrinho (user_id, produto_id, quantidade) VALUES (?, ?, ?)',
+        ((u, p, rng.randint(1, 5)) for u, p in zip(
+            sorteio(rng, n['users'], usuarios, n['carrinho']),
+            sorteio(rng, n['produtos'], produtos, n['carrinho']))))
+    for tabela in ('books', 'filmes'):
+        conn.executemany(
+            f'INSERT INTO {tabela} (titulo, user_id) VALUES (?, ?)',
+            ((f'Título {i}', u) for i, u in enumerate(sorteio(rng, n['users'], usuarios, n[tabela]), 1)))
+
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    return n
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print('uso: python gerar_dados.py ARQUIVO.db ESCALA')
+        sys.exit(1)
+    print(gerar(sys.argv[1], int(sys.argv[2])))
@@ -0,0 +1,123 @@
+# Roda os quatro apps num processo só, cada um num prefixo de URL.
+#
+#     /cadastro      -> app.py
+#     /loja          -> carrinho.py
+#     /login-flash   -> flask_login_flash_db.py
+#     /biblioteca    -> biblioteca_flask_app.py
+#
+# Cada app só é importado quando o seu prefixo recebe a primeira
+# requisição. Como estão no mesmo processo, todos dividem o pool de
+# conexões (conexoes.py), o cache de usuários (modelos.py) e a thread
+# de manutenção do banco.
+#
+# carrinho.py e flask_login_flash_db.py juntam vários arquivos num só
+# ("# Arquivo: app.py", "# Arquivo: templates/index.html", ...): deles o
+# host carrega a parte app.py e usa os templates que vêm junto. O pacote
+# do carrinho não traz login.html nem cadastro.html; esses vêm do pacote
+# do flask_login_flash_db, que tem os mesmos campos. Por último, os
+# templates são procurados na pasta do projeto (o index.html do app.py).
+#
+# Uso: python host.py
+import importlib
+import os
+import re
+import sys
+import threading
+import types
+
+from flask import Flask
+from jinja2 import ChoiceLoader, DictLoader, FileSystemLoader
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+
+# prefixo: (arquivo, seção com o código do app ou None se é um .py normal,
+#           outros pacotes de onde pegar os templates que faltarem)
+APPS = {
+    '/cadastro': ('app.py', None, ()),
+    '/loja': ('carrinho.py', 'app.py', ('flask_login_flash_db.py',)),
+    '/login-flash': ('flask_login_flash_db.py', 'app.py', ()),
+    '/biblioteca': ('biblioteca_flask_app.py', None, ()),
+}
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+MARCADOR = re.compile(r'^# Arquivo: (.+)$', re.MULTILINE)
+
+
+def separar_arquivos(texto):
+    # {'app.py': '...', 'templates/index.html': '...', ...}
+    partes = MARCADOR.split(texto)
+    return {nome.strip(): conteudo for nome, conteudo in zip(partes[1::2], partes[2::2])}
+
+
+def ler_pacote(arquivo):
+    with open(os.path.join(PASTA, arquivo), encoding='utf-8') as f:
+        return separar_arquivos(f.read())
+
+
+def templates_do_pacote(arquivos):
+    templates = {}
+    for nome_arquivo, conteudo in arquivos.items():
+        if nome_arquivo.startswith('templates/'):
+            # tira os comentários do tipo "# (HTML simplificado)"
+            linhas = [l for l in conteudo.strip().splitlines() if not l.startswith('#')]
+            templates[nome_arquivo[len('templates/'):]] = '\n'.join(linhas)
+    return templates
+
+
+def carregar_pacote(arquivo, secao):
+    caminho = os.path.join(PASTA, arquivo)
+    arquivos = ler_pacote(arquivo)
+
+    nome = arquivo[:-3].replace(' ', '_')
+    modulo = types.ModuleType(nome)
+    modulo.__file__ = caminho
+    sys.modules[nome] = modulo
+    exec(compile(arquivos[secao], f'{caminho}:{secao}', 'exec'), modulo.__dict__)
+    return modulo.app, templates_do_pacote(arquivos)
+
+
+def carregar(prefixo):
+    arquivo, secao, outros_pacotes = APPS[prefixo]
+    if secao is None:
+        app = importlib.import_module(arquivo[:-3]).app
+        templates = {}
+    else:
+        app, templates = carregar_pacote(arquivo, secao)
+    # os templates do próprio app têm prioridade sobre os emprestados
+    loaders = [DictLoader(templates)]
+    loaders += [DictLoader(templates_do_pacote(ler_pacote(p))) for p in outros_pacotes]
+    loaders += [app.jinja_loader, FileSystemLoader(PASTA)]
+    app.jinja_loader = ChoiceLoader(loaders)
+    # cada app tem o seu cookie de sessão, senão um sobrescreve o outro
+    app.config['SESSION_COOKIE_PATH'] = prefixo
+    return app
+
+
+class AppPreguicoso:
+    def __init__(self, prefixo):
+        self.prefixo = prefixo
+        self.app = None
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if self.app is None:
+            with self.lock:
+                if self.app is None:
+                    self.app = carregar(self.prefixo)
+        return self.app(environ, start_response)
+
+
+raiz = Flask(__name__)
+
+
+@raiz.route('/')
+def inicio():
+    links = ''.join(f'<li><a href="{p}/">{p}</a></li>' for p in APPS)
+    return f'<h1>Apps</h1><ul>{links}</ul>'
+
+
+app = DispatcherMiddleware(raiz, {prefixo: AppPreguicoso(prefixo) for prefixo in APPS})
+
+
+if __name__ == '__main__':
+    from werkzeug.serving import run_simple
+    run_simple('127.0.0.1', 5000, app, use_reloader=True, threaded=True)
@@ -3,6 +3,9 @@ import sqlite3
 # estabelecer um conexão
 conexao = sqlite3.connect("banco.db")
 
+# modo WAL: leitores (e o backup online) não travam quem escreve
+conexao.execute("PRAGMA journal_mode = WAL")
+
 # executar instrução de criação de 
 # tabela(s)
 with open('schema.sql') as f:
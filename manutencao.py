@@ -0,0 +1,217 @@
+# Manutenção do banco.db em segundo plano.
+#
+# Tarefas:
+# - ANALYZE + PRAGMA optimize quando muitas linhas mudaram desde o último
+# - checkpoint do WAL quando o arquivo -wal passa do limite (PASSIVE na
+#   thread, que não trava os escritores; TRUNCATE só no terminal)
+# - incremental_vacuum quando sobram muitas páginas livres
+#
+# As tarefas rodam numa thread, em pedaços pequenos com pausas entre
+# eles, e são adiadas enquanto os apps estão recebendo muitas
+# requisições. Tudo é registrado no log com o tempo de cada tarefa.
+#
+# Uso nos apps:
+#     agendador = iniciar_manutencao(app)
+#     ...
+#     agendador.registrar_alteracoes(conn.total_changes)
+#
+# Ou direto no terminal, com os apps parados (roda tudo uma vez):
+#     python manutencao.py
+# Só o terminal roda VACUUM, que reescreve o arquivo inteiro; ele também
+# deixa o banco em auto_vacuum incremental para a thread poder liberar
+# as páginas aos poucos depois.
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger('manutencao')
+
+BANCO = 'banco.db'
+
+
+class AgendadorManutencao:
+    def __init__(self, banco=BANCO, intervalo=60,
+                 limite_alteracoes=1000, limite_wal=4 * 1024 * 1024,
+                 limite_paginas_livres=0.2, paginas_por_passo=100,
+                 pausa_entre_passos=0.05, limite_requisicoes=20,
+                 intervalo_analyze=24 * 60 * 60, limite_analise=400):
+        self.banco = banco
+        self.intervalo = intervalo
+        self.limite_alteracoes = limite_alteracoes
+        self.limite_wal = limite_wal
+        self.limite_paginas_livres = limite_paginas_livres
+        self.paginas_por_passo = paginas_por_passo
+        self.pausa_entre_passos = pausa_entre_passos
+        # requisições por segundo acima das quais a manutenção espera
+        self.limite_requisicoes = limite_requisicoes
+        self.intervalo_analyze = intervalo_analyze
+        # linhas lidas por índice no ANALYZE (PRAGMA analysis_limit)
+        self.limite_analise = limite_analise
+
+        self.alteracoes = 0
+        self.ultimo_analyze = time.monotonic()
+        self.requisicoes = deque(maxlen=1000)
+        self.lock = threading.Lock()
+        self.parar = threading.Event()
+        self.thread = None
+
+    # --- chamado pelos apps ---
+    def registrar_requisicao(self):
+        self.requisicoes.append(time.monotonic())
+
+    def registrar_alteracoes(self, n=1):
+        with self.lock:
+            self.alteracoes += n
+
+    def taxa_requisicoes(self, janela=5):
+        agora = time.monotonic()
+        recentes = sum(1 for t in list(self.requisicoes) if agora - t <= janela)
+        return recentes / janela
+
+    def ocupado(self):
+        return self.taxa_requisicoes() > self.limite_requisicoes
+
+    # --- tarefas ---
+    def conectar(self):
+        return sqlite3.connect(self.banco, timeout=1)
+
+    def precisa_analyze(self):
+        vencido = time.monotonic() - self.ultimo_analyze >= self.intervalo_analyze
+        return self.alteracoes >= self.limite_alteracoes or vencido
+
+    def analisar(self, conn):
+        # com analysis_limit o ANALYZE lê só uma amostra de cada índice
+        conn.execute(f'PRAGMA analysis_limit = {self.limite_analise}')
+        conn.execute('ANALYZE')
+        conn.execute('PRAGMA optimize')
+        with self.lock:
+            self.alteracoes = 0
+        self.ultimo_analyze = time.monotonic()
+
+    def tamanho_wal(self):
+        try:
+            return os.path.getsize(self.banco + '-wal')
+        except OSError:
+            return 0
+
+    def checkpoint(self, conn, forcar=False):
+        if forcar:
+            # pela linha de comando: TRUNCATE espera leitores e escritores
+            # (até o timeout) e zera o arquivo -wal
+            _, paginas_log, paginas_copiadas = conn.execute(
+                'PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+            log.info('checkpoint TRUNCATE: %s de %s páginas copiadas',
+                     paginas_copiadas, paginas_log)
+            return
+        # na thread: PASSIVE não espera ninguém nem trava os escritores
+        _, paginas_log, paginas_copiadas = conn.execute(
+            'PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+        log.info('checkpoint PASSIVE: %s de %s páginas copiadas',
+                 paginas_copiadas, paginas_log)
+        if paginas_copiadas == paginas_log:
+            # tudo copiado: tenta zerar o -wal sem esperar. Com busy_timeout
+            # 0 o TRUNCATE desiste na hora se houver leitor (um backup, por
+            # exemplo) ou escritor, em vez de travar os escritores
+            conn.execute('PRAGMA busy_timeout = 0')
+            try:
+                ocupado = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()[0]
+            finally:
+                conn.execute('PRAGMA busy_timeout = 1000')
+            if not ocupado:
+                log.info('arquivo -wal zerado')
+
+    def proporcao_paginas_livres(self, conn):
+        total = conn.execute('PRAGMA page_count').fetchone()[0]
+        livres = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        return livres / total if total else 0
+
+    def liberar_paginas(self, conn, permitir_vacuum=False):
+        auto_vacuum = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        if auto_vacuum == 2:
+            # INCREMENTAL: libera aos poucos, com pausa entre os passos
+            while conn.execute('PRAGMA freelist_count').fetchone()[0] > 0:
+                if self.parar.is_set() or self.ocupado():
+                    log.info('incremental_vacuum interrompido')
+                    return
+                # executescript roda o pragma até o fim; com execute o
+                # sqlite3 do Python só libera uma página por chamada
+                conn.executescript(f'PRAGMA incremental_vacuum({self.paginas_por_passo})')
+                time.sleep(self.pausa_entre_passos)
+        elif permitir_vacuum:
+            # VACUUM reescreve o arquivo inteiro e não dá para fatiar;
+            # por isso só roda pelo terminal, com os apps parados
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+        else:
+            log.info('banco sem auto_vacuum incremental: rode python manutencao.py '
+                     'com os apps parados para liberar as páginas')
+
+    def cronometrar(self, nome, tarefa, conn, *argumentos):
+        inicio = time.perf_counter()
+        try:
+            tarefa(conn, *argumentos)
+        except sqlite3.OperationalError as erro:
+            # banco travado por um escritor: tenta de novo na próxima rodada
+            log.warning('%s falhou: %s', nome, erro)
+            return
+        log.info('%s levou %.3f s', nome, time.perf_counter() - inicio)
+
+    def executar(self, forcar=False):
+        conn = self.conectar()
+        try:
+            if forcar or self.precisa_analyze():
+                self.cronometrar('ANALYZE', self.analisar, conn)
+            if forcar or self.tamanho_wal() > self.limite_wal:
+                self.cronometrar('checkpoint', self.checkpoint, conn, forcar)
+            if forcar or self.proporcao_paginas_livres(conn) > self.limite_paginas_livres:
+                self.cronometrar('vacuum', self.liberar_paginas, conn, forcar)
+        finally:
+            conn.close()
+
+    # --- thread ---
+    def rodar(self):
+        espera = self.intervalo
+        while not self.parar.wait(espera):
+            if self.ocupado():
+                # recuo exponencial enquanto os apps estão ocupados
+                espera = min(espera * 2, self.intervalo * 8)
+                log.info('apps ocupados, manutenção adiada por %.0f s', espera)
+                continue
+            espera = self.intervalo
+            try:
+                self.executar()
+            except sqlite3.Error as erro:
+                # por exemplo banco travado durante um restaurar_backup;
+                # a thread continua e tenta de novo na próxima rodada
+                log.warning('manutenção falhou: %s', erro)
+
+    def iniciar(self):
+        self.thread = threading.Thread(target=self.rodar, name='manutencao', daemon=True)
+        self.thread.start()
+
+    def encerrar(self):
+        self.parar.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+agendadores = {}
+
+
+def iniciar_manutencao(app, **opcoes):
+    # um só agendador por banco, mesmo com vários apps no processo (host.py)
+    banco = opcoes.get('banco', BANCO)
+    agendador = agendadores.get(banco)
+    if agendador is None:
+        agendador = agendadores[banco] = AgendadorManutencao(**opcoes)
+        agendador.iniciar()
+    app.before_request(agendador.registrar_requisicao)
+    return agendador
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    AgendadorManutencao().executar(forcar=True)
@@ -0,0 +1,121 @@
+# Modelos leves usados pelos apps (carrinho, login e biblioteca).
+#
+# Cada modelo é uma namedtuple com __slots__ vazio: não tem __dict__,
+# é imutável e é montado direto da tupla que o cursor devolve, sem
+# precisar de row_factory = sqlite3.Row.
+#
+# Listagens (produtos, itens do carrinho) ficam como as tuplas simples
+# do cursor, na ordem das colunas: é o jeito mais barato de todos, mais
+# que sqlite3.Row e que montar uma namedtuple por linha. Os templates
+# desempacotam as colunas no próprio for.
+#
+# O mapa de identidade guarda os objetos já montados durante a
+# requisição atual (em flask.g), assim a mesma linha só vira objeto
+# uma vez por requisição.
+#
+# Os usuários também ficam num cache do processo (usuarios_em_cache),
+# compartilhado por todos os apps que rodam juntos no host.py.
+from collections import namedtuple
+
+from flask import g
+
+from cache import CacheLRU
+
+
+class User(namedtuple('User', 'id nome email', defaults=(None,))):
+    __slots__ = ()
+
+    # Mesmo contrato do UserMixin do Flask-Login. Não herdamos dele
+    # porque o UserMixin não tem __slots__ e traria o __dict__ de volta.
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def get_id(self):
+        return str(self.id)
+
+
+class Produto(namedtuple('Produto', 'id nome preco user_id')):
+    __slots__ = ()
+
+
+# Tabela e colunas (na mesma ordem dos campos) de cada modelo
+TABELAS = {
+    User: ('users', 'id, nome, email'),
+    Produto: ('produtos', 'id, nome, preco, user_id'),
+}
+
+# Itens do carrinho de um usuário: (id, nome, preco, quantidade)
+SQL_CARRINHO = '''SELECT c.id, p.nome, p.preco, c.quantidade FROM carrinho c
+                  JOIN produtos p ON c.produto_id = p.id
+                  WHERE c.user_id = ?'''
+
+
+def montar_select(modelo, where=''):
+    tabela, colunas = TABELAS[modelo]
+    return f'SELECT {colunas} FROM {tabela} {where}'
+
+
+class MapaIdentidade:
+    __slots__ = ('objetos',)
+
+    def __init__(self):
+        # {modelo: {id: objeto}}; o id é sempre a primeira coluna
+        self.objetos = {}
+
+    def obter(self, modelo, linha):
+        por_id = self.objetos.setdefault(modelo, {})
+        objeto = por_id.get(linha[0])
+        if objeto is None:
+            objeto = por_id[linha[0]] = modelo._make(linha)
+        return objeto
+
+    def ja_carregado(self, modelo, id):
+        return self.objetos.get(modelo, {}).get(id)
+
+
+def mapa_da_requisicao():
+    # flask.g é recriado a cada requisição, então o mapa também
+    if 'mapa_identidade' not in g:
+        g.mapa_identidade = MapaIdentidade()
+    return g.mapa_identidade
+
+
+def buscar_um(conn, modelo, where, params=()):
+    mapa = mapa_da_requisicao()
+    linha = conn.execute(montar_select(modelo, where), params).fetchone()
+    if linha is None:
+        return None
+    return mapa.obter(modelo, linha)
+
+
+def buscar_por_id(conn, modelo, id):
+    objeto = mapa_da_requisicao().ja_carregado(modelo, id)
+    if objeto is not None:
+        return objeto
+    return buscar_um(conn, modelo, 'WHERE id = ?', (id,))
+
+
+def buscar_todos(conn, modelo, where='', params=()):
+    # tuplas simples na ordem dos campos do modelo; listagens não passam
+    # pelo mapa, cada linha aparece uma vez só na requisição
+    return conn.execute(montar_select(modelo, where), params).fetchall()
+
+
+# Os apps não alteram usuários, mas o banco pode ser trocado por fora
+# (restaurar_backup, iniciar.py de novo, outro processo). Por isso cada
+# usuário só fica VALIDADE_USUARIO segundos no cache.
+VALIDADE_USUARIO = 60
+usuarios_em_cache = CacheLRU(10000, validade=VALIDADE_USUARIO)
+
+
+def carregar_usuario(obter_conexao, id):
+    # usado pelo user_loader do Flask-Login
+    usuario = usuarios_em_cache.obter(id)
+    if usuario is None:
+        conn = obter_conexao()
+        usuario = buscar_por_id(conn, User, id)
+        conn.close()
+        if usuario is not None:
+            usuarios_em_cache.guardar(id, usuario)
+    return usuario
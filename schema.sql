@@ -18,4 +18,24 @@ CREATE TABLE IF NOT EXISTS filmes (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     TITULO TEXT NOT NULL,
     USER_ID INTEGER REFERENCES users
-);
\ No newline at end of file
+);
+
+CREATE TABLE IF NOT EXISTS produtos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    preco REAL NOT NULL,
+    user_id INTEGER REFERENCES users
+);
+
+CREATE TABLE IF NOT EXISTS carrinho (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER REFERENCES users,
+    produto_id INTEGER REFERENCES produtos,
+    quantidade INTEGER
+);
+
+-- índices das buscas dos apps (login por email, carrinho e livros do usuário)
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE INDEX IF NOT EXISTS idx_carrinho_user_produto ON carrinho(user_id, produto_id);
+CREATE INDEX IF NOT EXISTS idx_books_user ON books(USER_ID);
+CREATE INDEX IF NOT EXISTS idx_filmes_user ON filmes(USER_ID);
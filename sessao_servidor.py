@@ -0,0 +1,193 @@
+# Sessão guardada no servidor em vez do cookie assinado do Flask.
+#
+# O navegador só recebe um id aleatório no cookie; os dados da sessão
+# (usuário do Flask-Login, mensagens do flash, etc.) ficam na tabela
+# sessoes do banco.db, com um cache LRU em memória na frente.
+#
+# - só grava no banco quando a sessão muda
+# - sessões vencidas são apagadas de uma vez, de tempos em tempos
+# - o cache guarda os dados já desserializados; só depois de
+#   VALIDADE_CACHE segundos ele confere a versão no banco (cada gravação
+#   troca a versão), assim um logout feito em outro processo vale em
+#   poucos segundos sem uma consulta por requisição
+# - quando o usuário logado muda (login, logout) a sessão ganha um id
+#   novo e a linha antiga é apagada, contra fixação de sessão
+#
+# É opcional: os apps chamam configurar_sessao(app, 'nome_do_app'), que
+# só liga a sessão no servidor com SESSAO_SERVIDOR=1 no ambiente. Sem
+# isso o Flask continua com o cookie assinado.
+import copy
+import os
+import secrets
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+import conexoes
+from cache import CacheLRU
+
+BANCO = 'banco.db'
+VALIDADE_CACHE = 5
+
+SQL_TABELA = '''CREATE TABLE IF NOT EXISTS sessoes (
+    id TEXT PRIMARY KEY,
+    versao TEXT NOT NULL,
+    dados TEXT NOT NULL,
+    expira REAL NOT NULL
+)'''
+
+
+class SessaoServidor(CallbackDict, SessionMixin):
+    def __init__(self, dados=None, sid=None, nova=False):
+        def ao_mudar(self):
+            self.modified = True
+
+        super().__init__(dados, ao_mudar)
+        self.sid = sid
+        self.new = nova
+        self.modified = False
+        # para saber no fim da requisição se houve login ou logout
+        self.usuario_inicial = self.get('_user_id')
+
+
+class InterfaceSessaoServidor(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, nome, banco=BANCO, capacidade_cache=1000, intervalo_limpeza=60 * 60,
+                 validade_cache=VALIDADE_CACHE):
+        # cada app tem o seu cookie: no localhost os cookies não separam
+        # por porta, e a sessão de um app não pode ser lida por outro
+        self.nome_cookie = f'sessao_{nome}'
+        self.banco = banco
+        # o cache guarda (versao, dados, expira, conferido_em)
+        self.cache = CacheLRU(capacidade_cache)
+        self.validade_cache = validade_cache
+        self.intervalo_limpeza = intervalo_limpeza
+        self.ultima_limpeza = 0
+
+        conn = self.conectar()
+        conn.execute(SQL_TABELA)
+        conn.commit()
+        conn.close()
+
+    def get_cookie_name(self, app):
+        return self.nome_cookie
+
+    def conectar(self):
+        return conexoes.obter_conexao(self.banco)
+
+    def validade(self, app):
+        return app.permanent_session_lifetime.total_seconds()
+
+    def guardar_no_cache(self, sid, versao, dados, expira):
+        self.cache.guardar(sid, (versao, dados, expira, time.monotonic()))
+
+    def carregar(self, sid):
+        registro = self.cache.obter(sid)
+        if registro is not None and time.monotonic() - registro[3] >= self.validade_cache:
+            # passou da validade: outro processo pode ter alterado ou
+            # apagado a sessão, então confere a versão no banco
+            conn = self.conectar()
+            linha = conn.execute('SELECT versao FROM sessoes WHERE id = ?', (sid,)).fetchone()
+            conn.close()
+            if linha is None or linha[0] != registro[0]:
+                self.cache.remover(sid)
+                registro = None
+            else:
+                self.guardar_no_cache(sid, *registro[:3])
+        if registro is None:
+            conn = self.conectar()
+            linha = conn.execute('SELECT versao, dados, expira FROM sessoes WHERE id = ?',
+                                 (sid,)).fetchone()
+            conn.close()
+            if linha is None:
+                return None
+            versao, dados, expira = linha
+            registro = (versao, self.serializer.loads(dados), expira)
+            self.guardar_no_cache(sid, *registro)
+        _, dados, expira = registro[:3]
+        if expira < time.time():
+            return None
+        # cópia: o flash() altera a lista _flashes que está dentro da sessão
+        return copy.deepcopy(dados)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            dados = self.carregar(sid)
+            if dados is not None:
+                return SessaoServidor(dados, sid=sid)
+        return SessaoServidor(sid=secrets.token_urlsafe(32), nova=True)
+
+    def limpar_vencidas(self, conn):
+        # uma só DELETE para todas as vencidas
+        agora = time.time()
+        if agora - self.ultima_limpeza < self.intervalo_limpeza:
+            return
+        self.ultima_limpeza = agora
+        conn.execute('DELETE FROM sessoes WHERE expira < ?', (agora,))
+
+    def save_session(self, app, session, response):
+        nome = self.get_cookie_name(app)
+        dominio = self.get_cookie_domain(app)
+        caminho = self.get_cookie_path(app)
+
+        if not session:
+            # sessão esvaziada (logout): apaga no banco e no navegador
+            if session.modified and not session.new:
+                self.cache.remover(session.sid)
+                conn = self.conectar()
+                conn.execute('DELETE FROM sessoes WHERE id = ?', (session.sid,))
+                conn.commit()
+                conn.close()
+                response.delete_cookie(nome, domain=dominio, path=caminho)
+            return
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        # só grava quando a sessão muda
+        if not session.modified:
+            return
+
+        conn = self.conectar()
+        # login ou logout: id novo, e o antigo deixa de valer
+        trocar_sid = not session.new and session.get('_user_id') != session.usuario_inicial
+        if trocar_sid:
+            self.cache.remover(session.sid)
+            conn.execute('DELETE FROM sessoes WHERE id = ?', (session.sid,))
+            session.sid = secrets.token_urlsafe(32)
+
+        versao = secrets.token_hex(8)
+        dados = dict(session)
+        expira = time.time() + self.validade(app)
+        conn.execute('INSERT OR REPLACE INTO sessoes (id, versao, dados, expira) VALUES (?, ?, ?, ?)',
+                     (session.sid, versao, self.serializer.dumps(dados), expira))
+        self.limpar_vencidas(conn)
+        conn.commit()
+        conn.close()
+        self.guardar_no_cache(session.sid, versao, dados, expira)
+
+        if session.new or session.permanent or trocar_sid:
+            response.set_cookie(
+                nome, session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=dominio, path=caminho,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+
+def usar_sessao_servidor(app, nome, **opcoes):
+    app.session_interface = InterfaceSessaoServidor(nome, **opcoes)
+    return app.session_interface
+
+
+def configurar_sessao(app, nome, **opcoes):
+    # desligada por padrão: liga com SESSAO_SERVIDOR=1 no ambiente
+    if os.environ.get('SESSAO_SERVIDOR') == '1':
+        return usar_sessao_servidor(app, nome, **opcoes)
+    return None